@@ -0,0 +1,228 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import hashlib
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+# 여러 페이지에서 함께 쓰는 데이터 로더
+# get_store()는 st.cache_resource로 한 번만 만들어지며, 반환된 DataFrame은 읽기 전용으로 사용
+
+DATA_DIR = "data"
+SCHOOLS = ["동산고", "송도고", "아라고", "하늘고"]
+EC_TARGETS = {"동산고": 1.0, "송도고": 2.0, "아라고": 8.0, "하늘고": 4.0}
+
+MAX_PLOT_POINTS = 2000
+# 차트용 집계 간격과 컬럼별 집계 방식 (변동폭은 급격한 변화가 보이도록 최댓값)
+PLOT_RESAMPLE_RULE = '10min'
+PLOT_AGG = {'ec': 'mean', 'temperature': 'mean', 'humidity': 'mean', 'ph': 'mean', 'ec_diff': 'max'}
+# 환경 데이터 컬럼 타입 (dtype 추론 생략)
+ENV_DTYPES = {'temperature': 'float32', 'humidity': 'float32', 'ph': 'float32', 'ec': 'float32'}
+# 환경 데이터 최소 시간 간격
+RESAMPLE_RULE = '1min'
+
+# 1. 파일 시스템 유틸리티 (NFC/NFD 대응)
+# 같은 파일명·시트명·학교명이 반복해서 정규화되므로 결과를 기억
+@lru_cache(maxsize=256)
+def normalize_text(text):
+    return unicodedata.normalize('NFC', str(text))
+
+# 폴더 목록은 한 번만 읽고 정규화하여 {NFC 파일명: 경로} 형태로 재사용
+def list_normalized(directory_path):
+    if not os.path.isdir(directory_path): return {}
+    # os.scandir는 항목 종류를 함께 알려주므로 파일 여부 확인에 추가 stat 호출이 없음
+    with os.scandir(directory_path) as it:
+        return {normalize_text(e.name): Path(e.path) for e in it if e.is_file()}
+
+# 폴더를 한 번만 훑으면서 확장자로 구분하고, 학교 이름은 정규식 한 번으로 찾음
+ENV_FILE_RE = re.compile('(' + '|'.join(re.escape(normalize_text(s)) for s in SCHOOLS) + ')_환경데이터')
+GROWTH_FILE_KEYWORD = "4개교_생육결과데이터"
+
+def discover_files(directory_path):
+    env_paths = {}
+    xlsx_path = None
+    for name, f in list_normalized(directory_path).items():
+        suffix = f.suffix.lower()
+        if suffix == '.csv':
+            m = ENV_FILE_RE.search(name)
+            if m and m.group(1) not in env_paths:
+                env_paths[m.group(1)] = f
+        elif suffix in ('.xlsx', '.xls') and xlsx_path is None and GROWTH_FILE_KEYWORD in name:
+            xlsx_path = f
+    return env_paths, xlsx_path
+
+# 시계열 다운샘플링 (LTTB: Largest-Triangle-Three-Buckets)
+def lttb(x, y, n_out=MAX_PLOT_POINTS):
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    # 시간축은 정수(ns)로 바꿔 삼각형 넓이를 계산
+    xv = x.astype('datetime64[ns]').astype(np.int64).astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xv[hi:nxt_hi].mean()
+        avg_y = y[hi:nxt_hi].mean()
+        area = np.abs((xv[a] - avg_x) * (y[lo:hi] - y[a]) - (xv[a] - xv[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+
+    return x[idx], y[idx]
+
+# 메모리 절약: 실수형은 float32로, 반복되는 문자열은 category로 변환
+def optimize_dataframe(df):
+    for c in df.select_dtypes(include='float').columns:
+        df[c] = pd.to_numeric(df[c], downcast='float')
+    for c in df.select_dtypes(include=['object', 'string']).columns:
+        if df[c].nunique() <= len(df) // 2:
+            df[c] = df[c].astype('category')
+    return df
+
+# 2. 데이터 로딩 (KeyError 완벽 방어)
+CACHE_DIR = Path(DATA_DIR) / ".cache"
+# 전처리 방식이 바뀌면 올려서 기존 캐시를 무효화
+CACHE_VERSION = 3
+
+# 원본 경로·수정 시각·전처리 버전으로 캐시 키를 만들어, 일치하는 Parquet가 있으면 그것을 읽음
+def cached_frame(source, name, build):
+    key = hashlib.md5(f"{source}:{source.stat().st_mtime}:{CACHE_VERSION}".encode()).hexdigest()
+    cache_path = CACHE_DIR / f"{name}-{key}.parquet"
+    if cache_path.exists():
+        try:
+            return pd.read_parquet(cache_path, engine='pyarrow')
+        except Exception:
+            cache_path.unlink(missing_ok=True)  # 손상된 캐시는 지우고 원본에서 다시 만듦
+
+    df = build()
+    if df is None:
+        return None
+    # 임시 파일에 다 쓴 뒤 교체하여, 쓰기가 중간에 실패해도 잘린 캐시가 남지 않도록 함
+    tmp_path = CACHE_DIR / f"{name}-{key}.{os.getpid()}.tmp"
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for old in CACHE_DIR.glob(f"{name}-*.parquet"):
+            old.unlink()
+        df.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)  # 쓰기 불가 환경에서는 캐시 없이 진행
+    return df
+
+# 엑셀 파일은 한 번만 열어 학교별 시트만 한 번에 파싱 (수정 시각이 바뀌면 다시 읽음)
+# 엔진은 pandas가 파일 형식에 맞게 고름 (.xlsx는 openpyxl read_only 모드로 열어 전체 DOM을 만들지 않음)
+# 최신 판 하나만 보관 (학교별 호출끼리 한 번의 파싱을 공유하는 용도)
+@st.cache_resource(max_entries=1)
+def read_workbook(xlsx_path, mtime):
+    with pd.ExcelFile(xlsx_path) as xl:
+        sheet_map = {normalize_text(s): s for s in xl.sheet_names}
+        targets = [sheet_map[t] for t in map(normalize_text, SCHOOLS) if t in sheet_map]
+        # 학교 시트가 하나도 없으면 빈 결과 (화면에서 데이터 없음 안내로 처리)
+        if not targets:
+            return {}
+        sheets = pd.read_excel(xl, sheet_name=targets)
+    return {normalize_text(name): df for name, df in sheets.items()}
+
+def read_env_csv(path):
+    # 헤더의 앞뒤 공백을 먼저 제거해야 컬럼 타입/날짜 지정이 적용됨
+    names = [c.strip() for c in pd.read_csv(path, nrows=0).columns]
+    # pyarrow의 멀티스레드 CSV 파서 사용 (Parquet 캐시와 함께 필수 의존성)
+    df = pd.read_csv(path, engine='pyarrow', header=0, names=names, dtype=ENV_DTYPES, parse_dates=['time'])
+
+    # 1분보다 촘촘하게 기록된 경우 1분 평균으로 묶은 뒤 변동폭 계산 (센서 잡음 및 데이터 크기 감소)
+    if df['time'].diff().median() < pd.Timedelta(RESAMPLE_RULE):
+        df = df.set_index('time').resample(RESAMPLE_RULE).mean(numeric_only=True)
+        df = df.dropna(subset=['ec']).reset_index()
+
+    # 변동폭은 float32 배열에서 한 번에 계산
+    ec = df['ec'].to_numpy(dtype=np.float32)
+    ec_diff = np.empty_like(ec)
+    ec_diff[:1] = 0
+    np.abs(np.subtract(ec[1:], ec[:-1], out=ec_diff[1:]), out=ec_diff[1:])
+    df['ec_diff'] = ec_diff
+    return df
+
+def read_growth_sheet(xlsx_path, school):
+    sheets = read_workbook(str(xlsx_path), xlsx_path.stat().st_mtime)
+    sheet = sheets.get(normalize_text(school))
+    if sheet is None:
+        return None
+    # 캐시된 원본 시트는 공유 객체이므로 복사본에서 작업
+    return sheet.rename(columns=lambda c: c.strip())
+
+# cache_data와 달리 호출할 때마다 pickle 복사를 하지 않고 같은 객체를 공유
+@st.cache_resource
+def get_store():
+    env_paths, xlsx_path = discover_files(DATA_DIR)
+    
+    env_dict = {}
+    env_plot = {}
+    growth_dict = {}
+
+    # 환경 데이터 로드
+    for school in SCHOOLS:
+        path = env_paths.get(school)
+        if path:
+            df = optimize_dataframe(cached_frame(path, f"{school}_env", lambda: read_env_csv(path)))
+            env_dict[school] = df
+            # 차트용으로 10분 단위 집계 후 다운샘플 (변동 통계는 원본 해상도 df로 계산)
+            agg = df.set_index('time').resample(PLOT_RESAMPLE_RULE).agg(PLOT_AGG).dropna(how='all').reset_index()
+            env_plot[school] = {c: lttb(agg['time'].values, agg[c].values) for c in PLOT_AGG}
+
+    # 생육 데이터 로드
+    if xlsx_path:
+        for school in SCHOOLS:
+            gdf = cached_frame(xlsx_path, f"{school}_growth", lambda: read_growth_sheet(xlsx_path, school))
+            if gdf is not None:
+                gdf['학교'] = school
+                gdf['설정EC'] = EC_TARGETS[school]
+                growth_dict[school] = optimize_dataframe(gdf)
+
+    # 학교별 요약 통계 (재실행 시마다 다시 계산하지 않도록 캐시 안에서 한 번의 groupby로 처리)
+    # 합친 DataFrame은 groupby에만 쓰고 저장하지 않음 (원본 사본을 계속 들고 있지 않도록)
+    env_summary = pd.DataFrame(columns=['학교', '평균변동폭'])
+    if env_dict:
+        # 학교 이름은 concat 키에서 가져와 학교별 assign 복사본을 만들지 않음
+        env_long = pd.concat(env_dict, names=['학교', None]).reset_index(level='학교').reset_index(drop=True)
+        env_long['학교'] = pd.Categorical(env_long['학교'], categories=SCHOOLS, ordered=True)
+        env_summary = env_long.groupby('학교', sort=False, observed=True).agg(
+            평균변동폭=('ec_diff', 'mean'),
+        ).reset_index()
+
+    growth_summary = pd.DataFrame(columns=['학교', '평균생중량'])
+    if growth_dict:
+        growth_long = pd.concat(growth_dict.values(), ignore_index=True)
+        growth_long['학교'] = pd.Categorical(growth_long['학교'], categories=SCHOOLS, ordered=True)
+        growth_summary = growth_long.groupby('학교', sort=False, observed=True).agg(
+            평균생중량=('생중량(g)', 'mean'),
+        ).reset_index()
+
+    return {
+        'env': env_dict,
+        'env_plot': env_plot,
+        'growth': growth_dict,
+        'env_summary': env_summary,
+        'growth_summary': growth_summary,
+    }
+
+# 학교별 차트용 (시간, 값) 배열
+def plot_series(school, column='ec'):
+    return get_store()['env_plot'][school][column]
+
+# 파생 데이터 (인자를 키로 캐시되어 재실행 시 다시 계산하지 않음)
+@st.cache_data
+def correlation_table(schools):
+    store = get_store()
+    env_summary, growth_summary = store['env_summary'], store['growth_summary']
+    c_df = growth_summary[['학교', '평균생중량']].merge(env_summary[['학교', '평균변동폭']], on='학교')
+    return c_df[c_df['학교'].isin(schools)].reset_index(drop=True)
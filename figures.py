@@ -0,0 +1,75 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+from plotly.colors import qualitative
+
+from data_loader import plot_series, correlation_table
+
+# 대시보드 차트 모음
+# 각 함수는 st.cache_data로 입력값별 Figure를 한 번만 만들며, 여러 페이지에서 같은 캐시를 공유
+
+# 차트 JSON 직렬화는 C로 구현된 orjson 사용 (설치되어 있지 않으면 기본 json 인코더)
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
+
+PLOTLY_FONT = dict(family="Malgun Gothic, Apple SD Gothic Neo, sans-serif")
+# 대화형 차트는 컨테이너 크기에 맞춰 반응, 고정 차트는 정적 이미지로 그려 이벤트 처리 생략
+PLOTLY_CONFIG = {'staticPlot': False, 'responsive': True}
+STATIC_PLOTLY_CONFIG = {'staticPlot': True}
+
+# 차트 생성 (입력값을 키로 캐시하여 재실행 시 Figure를 다시 만들지 않음)
+# 각 Figure는 transition_duration=0(애니메이션 없음)과 uirevision(재실행 시 확대 상태 유지)을 지정
+# 시계열은 x축 기준 통합 hover, 산점도는 가장 가까운 점만, 고정 차트는 hover 없음
+@st.cache_data
+def make_ec_trend_fig(schools):
+    fig = go.Figure()
+    for school in schools:
+        x, y = plot_series(school)
+        fig.add_trace(go.Scattergl(x=x, y=y, name=school))
+    fig.update_layout(xaxis_title="시간", yaxis_title="EC (dS/m)", font=PLOTLY_FONT, uirevision='ec',
+                      transition_duration=0, hovermode='x unified')
+    return fig
+
+@st.cache_data
+def make_impact_fig():
+    impact_df = pd.DataFrame({
+        "요인": np.array(["변동폭 (Magnitude)", "변동 횟수 (Frequency)", "변동 시간 (Duration)"], dtype=object),
+        "영향력": np.array([0.7, 0.2, 0.1], dtype=np.float64)
+    })
+    fig = go.Figure(go.Bar(x=impact_df["영향력"], y=impact_df["요인"], orientation='h',
+                           marker_color=qualitative.Plotly[:len(impact_df)], texttemplate='%{x}'))
+    fig.update_layout(xaxis_title="영향력", yaxis_title="요인", showlegend=False, font=PLOTLY_FONT,
+                      uirevision='static', transition_duration=0, hovermode=False, bargap=0.2)
+    return fig
+
+@st.cache_data
+def make_ec_detail_fig(school):
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1,
+                        subplot_titles=("EC 측정값", "변동 발생 시간 및 폭"))
+    x, y = plot_series(school)
+    fig.add_trace(go.Scattergl(x=x, y=y, name="EC"), row=1, col=1)
+    # 막대 그래프는 WebGL 대응이 없으므로 LTTB로 줄여서 표시 (급격한 변동은 보존)
+    x, y = plot_series(school, 'ec_diff')
+    fig.add_trace(go.Bar(x=x, y=y, name="변동폭"), row=2, col=1)
+    fig.update_layout(height=500, font=PLOTLY_FONT, showlegend=False, uirevision='ec',
+                      transition_duration=0, hovermode='x unified', bargap=0.2)
+    return fig
+
+@st.cache_data
+def make_corr_fig(schools):
+    c_df = correlation_table(schools)
+    if c_df.empty:
+        return None
+    fig = go.Figure(go.Scattergl(x=c_df["평균변동폭"], y=c_df["평균생중량"], text=c_df["학교"],
+                                 mode='markers+text', marker=dict(size=20),
+                                 hovertemplate="평균변동폭=%{x}<br>평균생중량=%{y}<br>학교=%{text}<extra></extra>",
+                                 textposition='top center', showlegend=False))
+    fig.update_layout(title="변동폭과 생중량 간의 관계", xaxis_title="평균변동폭", yaxis_title="평균생중량",
+                      font=PLOTLY_FONT, uirevision='static', transition_duration=0, hovermode='closest')
+    return fig
@@ -1,12 +1,11 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from pathlib import Path
-import unicodedata
 import io
 
+from data_loader import get_store
+from figures import (PLOTLY_CONFIG, STATIC_PLOTLY_CONFIG, make_ec_trend_fig, make_impact_fig,
+                     make_ec_detail_fig, make_corr_fig)
+
 # 1. 페이지 설정
 st.set_page_config(page_title="극지식물 생육 대시보드", layout="wide")
 
@@ -20,96 +19,41 @@ html, body, [class*="css"], .stMarkdown {
 </style>
 """, unsafe_allow_html=True)
 
-PLOTLY_FONT = dict(family="Malgun Gothic, Apple SD Gothic Neo, sans-serif")
-
-# 2. 파일 시스템 유틸리티 (NFC/NFD 대응)
-def get_safe_path(directory_path, keyword):
-    p = Path(directory_path)
-    if not p.exists(): return None
-    
-    target_norm = unicodedata.normalize('NFC', keyword)
-    for file in p.iterdir():
-        file_norm = unicodedata.normalize('NFC', file.name)
-        if target_norm in file_norm:
-            return file
-    return None
-
-# 3. 데이터 로딩 (KeyError 완벽 방어)
-@st.cache_data
-def load_and_preprocess():
-    data_dir = "data"
-    schools = ["동산고", "송도고", "아라고", "하늘고"]
-    ec_targets = {"동산고": 1.0, "송도고": 2.0, "아라고": 8.0, "하늘고": 4.0}
-    
-    env_dict = {}
-    growth_dict = {}
-
-    # 환경 데이터 로드
-    for school in schools:
-        path = get_safe_path(data_dir, f"{school}_환경데이터")
-        if path:
-            df = pd.read_csv(path)
-            df.columns = [c.strip() for c in df.columns]
-            df['time'] = pd.to_datetime(df['time'])
-            df['ec_diff'] = df['ec'].diff().abs().fillna(0)
-            env_dict[school] = df
-
-    # 생육 데이터 로드
-    xlsx_path = get_safe_path(data_dir, "4개교_생육결과데이터")
-    if xlsx_path:
-        xl = pd.ExcelFile(xlsx_path)
-        for school in schools:
-            target_s = unicodedata.normalize('NFC', school)
-            matched_s = next((s for s in xl.sheet_names if unicodedata.normalize('NFC', s) == target_s), None)
-            if matched_s:
-                gdf = pd.read_excel(xlsx_path, sheet_name=matched_s)
-                gdf.columns = [c.strip() for c in gdf.columns]
-                gdf['학교'] = school
-                gdf['설정EC'] = ec_targets[school]
-                growth_dict[school] = gdf
-
-    return env_dict, growth_dict
-
+# 2. 데이터 로딩
 with st.spinner('데이터를 정규화하고 분석하는 중입니다...'):
-    env_dict, growth_dict = load_and_preprocess()
+    store = get_store()
+env_dict, growth_dict = store['env'], store['growth']
 
 if not env_dict or not growth_dict:
     st.error("데이터 파일을 찾을 수 없습니다. 'data/' 폴더 구성을 확인해주세요.")
     st.stop()
 
-# 4. 사이드바 및 레이아웃
-selected_school = st.sidebar.selectbox("학교 필터", ["전체", "송도고", "하늘고", "아라고", "동산고"])
+# 3. 사이드바 및 레이아웃
 st.title("🌱 EC 농도 변화량에 따른 극지식물 생육 변화")
 
+# 학교 필터를 바꿔도 이 영역만 다시 실행 (다른 탭의 차트는 그대로 유지)
+@st.fragment
+def render_ec_trend():
+    selected_school = st.selectbox("학교 필터", ["전체", "송도고", "하늘고", "아라고", "동산고"])
+
+    target_list = [selected_school] if selected_school != "전체" else list(env_dict.keys())
+    fig1 = make_ec_trend_fig(tuple(s for s in target_list if s in env_dict))
+    st.plotly_chart(fig1, use_container_width=True, config=PLOTLY_CONFIG)
+
 tab1, tab2, tab3 = st.tabs(["📈 EC 변동성 분석", "🔎 동산고 심층 원인", "📊 생육 상관관계"])
 
 # --- Tab 1: 변동성 및 영향력 분석 ---
 with tab1:
     st.subheader("학교별 EC 농도 변화량")
-    
-    fig1 = go.Figure()
-    target_list = [selected_school] if selected_school != "전체" else list(env_dict.keys())
-    
-    for school in target_list:
-        if school in env_dict:
-            df = env_dict[school]
-            fig1.add_trace(go.Scatter(x=df['time'], y=df['ec'], name=school))
-    
-    fig1.update_layout(xaxis_title="시간", yaxis_title="EC (dS/m)", font=PLOTLY_FONT)
-    st.plotly_chart(fig1, use_container_width=True)
+    render_ec_trend()
 
     # 요청 사항: 영향력 분석 추가
     st.markdown("---")
     st.subheader("💡 생육 영향 요인 분석")
     col_a, col_b = st.columns([1, 1])
     with col_a:
-        impact_df = pd.DataFrame({
-            "요인": ["변동폭 (Magnitude)", "변동 횟수 (Frequency)", "변동 시간 (Duration)"],
-            "영향력": [0.7, 0.2, 0.1]
-        })
-        fig_impact = px.bar(impact_df, x="영향력", y="요인", orientation='h', color="요인", text_auto=True)
-        fig_impact.update_layout(showlegend=False, font=PLOTLY_FONT)
-        st.plotly_chart(fig_impact, use_container_width=True)
+        fig_impact = make_impact_fig()
+        st.plotly_chart(fig_impact, use_container_width=True, config=STATIC_PLOTLY_CONFIG)
     with col_b:
         st.write("#### 어떤 요인이 가장 큰 영향을 미치는가?")
         st.info("""
@@ -124,17 +68,12 @@ with tab2:
     st.header("동산고 생육 저하 원인 심층 분석")
     
     if "동산고" in env_dict:
-        ds_env = env_dict["동산고"]
         ds_growth = growth_dict.get("동산고", pd.DataFrame())
         
         col1, col2 = st.columns([3, 2])
         with col1:
-            fig2 = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1,
-                                 subplot_titles=("EC 측정값", "변동 발생 시간 및 폭"))
-            fig2.add_trace(go.Scatter(x=ds_env['time'], y=ds_env['ec'], name="EC"), row=1, col=1)
-            fig2.add_trace(go.Bar(x=ds_env['time'], y=ds_env['ec_diff'], name="변동폭"), row=2, col=1)
-            fig2.update_layout(height=500, font=PLOTLY_FONT, showlegend=False)
-            st.plotly_chart(fig2, use_container_width=True)
+            fig2 = make_ec_detail_fig("동산고")
+            st.plotly_chart(fig2, use_container_width=True, config=PLOTLY_CONFIG)
             
         with col2:
             st.write("### 📍 생중량이 낮았던 3가지 주요 원인")
@@ -151,31 +90,44 @@ with tab2:
 # --- Tab 3: 상관관계 분석 ---
 with tab3:
     st.header("EC 농도 변화량과 생중량의 상관관계")
-    corr_list = []
-    for school in growth_dict.keys():
-        if school in env_dict:
-            corr_list.append({
-                "학교": school,
-                "평균생중량": growth_dict[school]['생중량(g)'].mean(),
-                "평균변동폭": env_dict[school]['ec_diff'].mean()
-            })
+    fig3 = make_corr_fig(tuple(growth_dict.keys()))
     
-    if corr_list:
-        c_df = pd.DataFrame(corr_list)
-        fig3 = px.scatter(c_df, x="평균변동폭", y="평균생중량", text="학교", 
-                         title="변동폭과 생중량 간의 관계", size=[10]*len(c_df))
-        fig3.update_traces(textposition='top center')
-        fig3.update_layout(font=PLOTLY_FONT)
-        st.plotly_chart(fig3, use_container_width=True)
+    if fig3 is not None:
+        st.plotly_chart(fig3, use_container_width=True, config=PLOTLY_CONFIG)
         
         st.write("📌 **결론**: EC의 절대적인 농도(설정값)뿐만 아니라, **변동폭을 최소화하여 안정적인 환경을 제공하는 것**이 극지식물 생중량 증가의 핵심입니다.")
 
-# 5. 다운로드 기능
-st.sidebar.markdown("---")
-if st.sidebar.button("결과 보고서 다운로드"):
+# 4. 다운로드 기능
+# xlsxwriter constant_memory 모드: 행 단위로 바로 기록하여 워크북 전체를 메모리에 두지 않음
+# (이 모드는 행 순서대로만 쓸 수 있어 열 단위로 쓰는 DataFrame.to_excel 대신 직접 기록)
+# 공유 저장소의 DataFrame은 바뀌지 않으므로 객체 id로 캐시 키를 만들어 한 번만 생성
+@st.cache_data(hash_funcs={dict: lambda d: tuple((k, id(v)) for k, v in d.items())})
+def build_xlsx_bytes(frames):
+    import xlsxwriter  # 다운로드할 때만 불러옴
+
     buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine='openpyxl') as writer:
-        for s, df in growth_dict.items():
-            df.to_excel(writer, sheet_name=s, index=False)
-    st.sidebar.download_button(label="📥 엑셀 파일 받기", data=buf.getvalue(), 
-                             file_name="growth_analysis.xlsx", mime="application/vnd.ms-excel")
+    workbook = xlsxwriter.Workbook(buf, {'constant_memory': True})
+    for name, df in frames.items():
+        # float32 값은 문자열 표현을 거쳐 원래 소수 자릿수로 기록
+        float32_cols = df.select_dtypes(include='float32').columns
+        df = df.astype({c: str for c in float32_cols}).astype({c: 'float64' for c in float32_cols})
+        rows = df.astype(object).where(df.notna(), None)
+
+        sheet = workbook.add_worksheet(name)
+        sheet.write_row(0, 0, df.columns)
+        for r, row in enumerate(rows.itertuples(index=False), start=1):
+            sheet.write_row(r, 0, row)
+    workbook.close()
+    return buf.getvalue()
+
+# 버튼을 눌렀을 때만 엑셀을 만들고, 이 영역만 다시 실행 (다른 탭은 재실행하지 않음)
+@st.fragment
+def download_section():
+    if st.button("결과 보고서 다운로드"):
+        st.download_button(label="📥 엑셀 파일 받기", data=build_xlsx_bytes(growth_dict), 
+                           file_name="growth_analysis.xlsx", mime="application/vnd.ms-excel",
+                           on_click="ignore")
+
+with st.sidebar:
+    st.markdown("---")
+    download_section()